@@ -1,3 +1,5 @@
+import argparse
+import concurrent.futures
 import os
 import sys
 
@@ -18,78 +20,164 @@ Where:
 
 # ---- Utility Functions ----
 
+SIZE_UNITS = ("B", "KB", "MB", "GB", "TB", "PB")
+
 def human_size(nbytes):
     """Return human-readable size using binary units (KB = 1024)."""
     if nbytes < 1024:
         return f"{nbytes}B"
-    for unit in ("KB", "MB", "GB", "TB", "PB"):
-        nbytes /= 1024.0
-        if nbytes < 1024.0:
-            s = f"{nbytes:.2f}".rstrip("0").rstrip(".")
-            return f"{s}{unit}"
-    return f"{nbytes:.2f}PB"
-
-def dir_size(path, follow_symlinks=False):
-    """Compute total size of a directory."""
-    total = 0
-    for root, _, files in os.walk(path, followlinks=follow_symlinks):
-        for f in files:
-            fp = os.path.join(root, f)
-            try:
-                if not os.path.exists(fp):
-                    continue
-                total += os.path.getsize(fp)
-            except (OSError, PermissionError):
-                continue
-    return total
+    # every 10 bits of magnitude is one 1024 step
+    i = min(len(SIZE_UNITS) - 1, (nbytes.bit_length() - 1) // 10)
+    s = f"{nbytes / (1 << (10 * i)):.2f}".rstrip("0").rstrip(".")
+    return f"{s}{SIZE_UNITS[i]}"
+
+def _is_dir(entry, follow_symlinks):
+    """DirEntry.is_dir() that, like os.path.isdir, is False for a broken or looping link."""
+    try:
+        return entry.is_dir(follow_symlinks=follow_symlinks)
+    except OSError:
+        return False
+
+def _is_link(entry):
+    """True for symlinks and, on Windows, directory junctions (from d_type, no stat)."""
+    return entry.is_symlink() or (hasattr(entry, "is_junction") and entry.is_junction())
+
+def _dir_id(path):
+    """Return (st_dev, st_ino) of a folder, or None if it cannot be stat'd."""
+    try:
+        st = os.stat(path)
+    except (OSError, PermissionError):
+        return None
+    return st.st_dev, st.st_ino
+
+def _within(path, paths):
+    """True if path or one of its parent folders is in paths."""
+    while True:
+        if path in paths:
+            return True
+        parent = os.path.dirname(path)
+        if parent == path:
+            return False
+        path = parent
 
 # ---- Printing Tree ----
 
-def list_tree(path, follow_symlinks=False, excluded=None, nestedLevel=1):
+def _walk(path, follow_symlinks=False, excluded=None, nestedLevel=1, pool=None, chain=None,
+          no_size=False):
     """
-    Recursively print directory tree in Obsidian using collapsible code blocks.
-    Each folder is a foldable block; files are indented inside.
+    Walk a directory tree once, post-order, in Obsidian code block style.
+    Returns (total_bytes, lines): each file is stat'd exactly once and
+    folder sizes are summed from their children as the walk unwinds.
+    `excluded` names are pruned in this directory only, before descending.
+    `chain` holds (real path, (dev, ino)) for the root and for each linked
+    folder expanded on the way down to this one. A link whose target lies
+    inside one of them, or is one of them by (dev, ino), is shown as
+    <symlink> and not entered; a plain folder that is one of them is shown
+    as <already listed>. Only links are resolved, so plain folders cost no
+    stat, and the result depends on the branch alone, not on the pool.
+    With no_size, lines carry no size column and the listing is readdir
+    only: no stat for files or plain folders, one realpath() and stat per
+    linked folder.
+
+    If a thread or process pool is given, the first level with more than 4
+    subfolders hands each subfolder to the pool; those subtrees are walked
+    serially. Process pool tasks go through _render_subtree and their
+    block is split back into lines here.
     """
     excluded = excluded or set()
     indent = "  " * nestedLevel  # 2 spaces per level
+    if chain is None:
+        path = os.path.realpath(path)
+        chain = ((path, _dir_id(path)),)
 
     try:
-        entries = sorted(
-            os.listdir(path),
-            key=lambda n: (not os.path.isdir(os.path.join(path, n)), n.lower())
-        )
+        # resolve is_dir once per entry; sort key and body reuse it
+        with os.scandir(path) as it:
+            entries = [(e, _is_dir(e, follow_symlinks)) for e in it if e.name not in excluded]
+        entries.sort(key=lambda pair: (not pair[1], pair[0].name.lower()))
     except (OSError, PermissionError):
-        print(f"{indent}[ ] !! {os.path.basename(path)} <inaccessible>")
-        return
+        return 0, [f"{indent}[ ] !! {os.path.basename(path)} <inaccessible>"]
 
-    for name in entries:
-        if name in excluded:
+    chain_paths = {p for p, _ in chain}
+    chain_ids = {i for _, i in chain if i is not None}
+    to_walk = {}  # subfolder name -> (path to walk, chain for that walk)
+    markers = {}  # subfolder name -> marker printed instead of its contents
+    for e, is_dir in entries:
+        if not is_dir:
             continue
+        if _is_link(e):
+            target = os.path.realpath(e.path)
+            target_id = _dir_id(target)
+            if _within(target, chain_paths) or target_id in chain_ids:
+                markers[e.name] = "<symlink>"
+            else:
+                to_walk[e.name] = (target, chain + ((target, target_id),))
+        elif e.path in chain_paths:
+            markers[e.name] = "<already listed>"
+        else:
+            to_walk[e.name] = (e.path, chain)
 
-        full = os.path.join(path, name)
-        is_dir = os.path.isdir(full)
-
-        try:
-            size_bytes = dir_size(full, follow_symlinks) if is_dir else os.path.getsize(full)
-            size_str = human_size(size_bytes)
-        except (OSError, PermissionError):
-            size_str = "<inaccessible>"
-
-        icon = "FO" if is_dir else "FI"
+    futures = {}
+    processes = isinstance(pool, concurrent.futures.ProcessPoolExecutor)
+    if pool is not None and len(to_walk) > 4:
+        task = _render_subtree if processes else _walk
+        futures = {name: pool.submit(task, p, follow_symlinks, nestedLevel=nestedLevel + 1,
+                                     chain=c, no_size=no_size)
+                   for name, (p, c) in to_walk.items()}
 
+    total = 0
+    lines = []
+    for entry, is_dir in entries:
+        name = entry.name
         if is_dir:
-            print(f"{indent}[ ] {icon} {name}  {size_str}")
-            # recursive call for contents
-            list_tree(full, follow_symlinks, excluded=excluded, nestedLevel=nestedLevel + 1)
+            if name in markers:
+                lines.append(f"{indent}[ ] FO {name}  {markers[name]}")
+                continue
+            if futures:
+                size_bytes, child_lines = futures[name].result()
+                if processes:
+                    child_lines = child_lines.split("\n") if child_lines else []
+            else:
+                # recursive call for contents
+                child_path, child_chain = to_walk[name]
+                size_bytes, child_lines = _walk(child_path, follow_symlinks,
+                                                nestedLevel=nestedLevel + 1, pool=pool,
+                                                chain=child_chain, no_size=no_size)
+            total += size_bytes
+            if no_size:
+                lines.append(f"{indent}[ ] FO {name}")
+            else:
+                lines.append(f"{indent}[ ] FO {name}  {human_size(size_bytes)}")
+            lines.extend(child_lines)
+        elif no_size:
+            lines.append(f"{indent}- [ ] FI {name}")
         else:
-            print(f"{indent}- [ ] {icon} {name}  {size_str}")
+            try:
+                size_bytes = entry.stat(follow_symlinks=follow_symlinks).st_size
+                total += size_bytes
+                size_str = human_size(size_bytes)
+            except (OSError, PermissionError):
+                size_str = "<inaccessible>"
+            lines.append(f"{indent}- [ ] FI {name}  {size_str}")
+
+    return total, lines
+
+def _render_subtree(path, follow_symlinks, nestedLevel, chain=None, no_size=False):
+    """
+    Process pool task: walk one subtree and return (total_bytes, rendered_block).
+    The lines come back pre-joined so the worker pickles one string.
+    """
+    size_bytes, lines = _walk(path, follow_symlinks, nestedLevel=nestedLevel, chain=chain,
+                              no_size=no_size)
+    return size_bytes, "\n".join(lines)
 
 # ---- Folder Selection ----
 
 def choose_excluded_folders(root):
     """Show top-level folders and allow user to uncheck (exclude) them."""
     try:
-        entries = [e for e in os.listdir(root) if os.path.isdir(os.path.join(root, e))]
+        with os.scandir(root) as it:
+            entries = [e.name for e in it if _is_dir(e, True)]
     except (OSError, PermissionError):
         print("Cannot read directory contents.")
         return set()
@@ -122,7 +210,25 @@ def choose_excluded_folders(root):
 
 # ---- Main ----
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="List all files in a directory with their sizes.")
+    parser.add_argument(
+        "--stat-threads", type=int, default=min(32, (os.cpu_count() or 1) * 4),
+        help="threads used to walk top-level subfolders in parallel (0 = walk serially)"
+    )
+    parser.add_argument(
+        "--processes", type=int, default=0,
+        help="worker processes used to walk and render top-level subfolders; "
+             "overrides --stat-threads for very large, CPU-bound trees (default: 0 = off)"
+    )
+    parser.add_argument(
+        "--no-size", action="store_true",
+        help="only list the tree structure; skip all size computation"
+    )
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
     root = input("Enter absolute directory path: ").strip()
     if not os.path.exists(root):
         print("Path does not exist:", root)
@@ -131,11 +237,30 @@ def main():
     excluded = choose_excluded_folders(root)
 
     base_name = os.path.basename(root) or root
-    size_bytes = dir_size(root, follow_symlinks=True)
-    print("```")
-    print(f"[ ] FO {base_name:<30} {human_size(size_bytes)}")
-    list_tree(root, follow_symlinks=True, excluded=excluded)
-    print("```")
+    if args.processes > 0:
+        pool = concurrent.futures.ProcessPoolExecutor(max_workers=args.processes)
+    elif args.stat_threads > 0:
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=args.stat_threads)
+    else:
+        pool = None
+    try:
+        size_bytes, lines = _walk(root, follow_symlinks=True, excluded=excluded, pool=pool,
+                                  no_size=args.no_size)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    if args.no_size:
+        header = f"[ ] FO {base_name}"
+    else:
+        header = f"[ ] FO {base_name:<30} {human_size(size_bytes)}"
+    # emit the whole block with one write instead of a print() per entry
+    sys.stdout.write("\n".join([
+        "```",
+        header,
+        *lines,
+        "```",
+    ]))
+    sys.stdout.write("\n")
     input("Please entry any key to exit....")
     sys.exit()
 